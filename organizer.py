@@ -33,8 +33,10 @@ Note: Only one option can be used at a time.
 
 Dependencies:
     Standard Python libraries with optional khayyam support:
-    - os, shutil, glob, argparse, logging, filecmp, hashlib, datetime
+    - os, shutil, argparse, errno, logging, hashlib, mmap, time, datetime,
+      functools, concurrent.futures
     - khayyam (optional, for Persian date functionality)
+    - blake3 (optional, for faster duplicate detection; falls back to MD5)
 
 Author: Hossein Naseri
 License: MIT
@@ -43,31 +45,81 @@ Version: 2.0
 
 import os
 import shutil
-import glob
 import argparse
+import errno
 import logging
 import hashlib
+import mmap
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from filecmp import cmp
+from functools import lru_cache
 
 try:
     from khayyam import JalaliDatetime
     KHAYYAM_AVAILABLE = True
 except ImportError:
     KHAYYAM_AVAILABLE = False
-    logging.warning("khayyam library not found. Using Gregorian calendar instead.")
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("file_organizer.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+# Upper size bounds in MB for the light and medium size categories
+LIGHT_MB, MEDIUM_MB = 10, 100
+# Read size for hashing, and the file size from which to memory map instead
+HASH_CHUNK_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 16 * 1024 * 1024
+# Leading bytes compared before hashing whole files for duplicates
+PREHASH_SIZE = 64 * 1024
+# Files up to this size are compared by content instead of hashed, as long as
+# one size bucket of them fits in SMALL_BUCKET_BYTES
+SMALL_FILE_SIZE = 4096
+SMALL_BUCKET_BYTES = 16 * 1024 * 1024
+# Worker threads for file operations, overridable with FILEORG_WORKERS
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
 logger = logging.getLogger(__name__)
 
+def setup_logging():
+    """
+    Configure logging: everything goes to the log file, only warnings and errors to the console.
+    """
+    file_handler = logging.FileHandler("file_organizer.log", encoding='utf-8')
+    file_handler.setLevel(logging.INFO)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.WARNING)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[file_handler, console_handler]
+    )
+
+    if not KHAYYAM_AVAILABLE:
+        logger.warning("khayyam library not found. Using Gregorian calendar instead.")
+
+def get_max_workers():
+    """
+    Get the number of worker threads, taken from FILEORG_WORKERS when set.
+
+    Returns:
+        int: Number of worker threads, at least 1
+    """
+    value = os.environ.get("FILEORG_WORKERS", "").strip()
+    if not value:
+        return DEFAULT_WORKERS
+    try:
+        workers = int(value)
+    except ValueError:
+        logger.warning("Invalid FILEORG_WORKERS value %r, using %s worker threads", value, DEFAULT_WORKERS)
+        return DEFAULT_WORKERS
+    if workers < 1:
+        logger.warning("FILEORG_WORKERS must be at least 1, got %s. Using 1 worker thread.", workers)
+        return 1
+    return workers
+
 def get_files(path="."):
     """
     Retrieve all files in the specified directory.
@@ -76,241 +128,349 @@ def get_files(path="."):
         path (str): Path to the directory to scan for files
 
     Returns:
-        list: Sorted list of file paths in the directory
+        list: Sorted list of (file path, os.stat_result) pairs in the directory
     """
+    skip_names = {os.path.basename(__file__), "file_organizer.log"}
     try:
-        all_items = glob.glob(os.path.join(path, "*"))
-        files = [
-            item for item in all_items
-            if os.path.isfile(item) and os.path.basename(item) not in [os.path.basename(__file__), "file_organizer.log"]
-        ]
+        files = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                # Hidden files are skipped, as glob's "*" pattern did
+                if (not entry.is_file(follow_symlinks=False) or entry.name in skip_names
+                        or entry.name.startswith(".")):
+                    continue
+                try:
+                    files.append((entry.path, entry.stat(follow_symlinks=False)))
+                except OSError as e:
+                    # The file may have vanished since the directory was listed
+                    logger.error("Error getting metadata for %s: %s", entry.path, e)
         return sorted(files)
     except Exception as e:
-        logger.error(f"Error retrieving files: {e}")
+        logger.error("Error retrieving files: %s", e)
         return []
 
-def get_file_size(file_path):
+def calculate_file_hash(file_path, chunk_size=HASH_CHUNK_SIZE, max_bytes=None):
     """
-    Get file size in megabytes.
+    Calculate hash of a file for duplicate detection.
+
+    Uses BLAKE3 when the blake3 library is installed, otherwise MD5.
 
     Args:
         file_path (str): Path to the file
+        chunk_size (int): Size of chunks to read at a time
+        max_bytes (int): Only hash the first max_bytes of the file (optional)
 
     Returns:
-        float: File size in MB rounded to 2 decimal places
+        str: Hex digest of the file content or None on error
     """
     try:
-        stat_res = os.stat(file_path)
-        return round(stat_res.st_size / (1024 * 1024), 2)
+        if BLAKE3_AVAILABLE:
+            file_hash = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        else:
+            file_hash = hashlib.md5()
+        with open(file_path, "rb") as f:
+            if max_bytes is not None:
+                file_hash.update(f.read(max_bytes))
+            else:
+                file_size = os.fstat(f.fileno()).st_size
+                if file_size >= MMAP_THRESHOLD:
+                    if BLAKE3_AVAILABLE:
+                        file_hash.update_mmap(file_path)
+                    else:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                                mm.madvise(mmap.MADV_SEQUENTIAL)
+                            file_hash.update(mm)
+                else:
+                    # Reuse one buffer, no larger than the file, instead of allocating
+                    # a bytes object per chunk
+                    buffer = bytearray(min(chunk_size, file_size))
+                    view = memoryview(buffer)
+                    while True:
+                        bytes_read = f.readinto(buffer)
+                        if not bytes_read:
+                            break
+                        file_hash.update(view[:bytes_read])
+        return file_hash.hexdigest()
     except Exception as e:
-        logger.error(f"Error getting file size for {file_path}: {e}")
-        return 0
+        logger.error("Error calculating hash for %s: %s", file_path, e)
+        return None
 
-def calculate_file_hash(file_path, chunk_size=8192):
+def read_file_content(file_path):
     """
-    Calculate MD5 hash of a file for duplicate detection.
+    Read the whole content of a small file for direct comparison.
 
     Args:
         file_path (str): Path to the file
-        chunk_size (int): Size of chunks to read at a time
 
     Returns:
-        str: MD5 hash of the file content or None on error
+        bytes: File content or None on error
     """
-    hash_md5 = hashlib.md5()
     try:
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(chunk_size), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+            return f.read()
     except Exception as e:
-        logger.error(f"Error calculating hash for {file_path}: {e}")
+        logger.error("Error reading %s: %s", file_path, e)
         return None
 
-def create_folders(path, folder_names):
+def group_files(buckets, key_func, executor=None, read_order=None):
     """
-    Create necessary folders for organization.
+    Split buckets of candidate files into groups sharing a content key such as their hash.
+
+    With an executor, the files of all buckets are submitted in one go so a single
+    pool serves every bucket. Without one, buckets are read one at a time so only
+    one bucket's keys are held in memory.
 
     Args:
-        path (str): Base path where folders should be created
-        folder_names (list): List of folder names to create
+        buckets (list): Lists of file paths that may duplicate each other
+        key_func (callable): Function returning a file's key, or None on error
+        executor (Executor): Thread pool to read the files on (optional, reads serially without one)
+        read_order (callable): Sort key for the order files are read in, e.g. inode (optional).
+            Serial reads follow it exactly within each bucket; with an executor it only
+            orders submission.
+
+    Returns:
+        list: Groups of two or more files sharing a key, each in input order
     """
-    for folder_name in folder_names:
-        folder_path = os.path.join(path, folder_name)
-        try:
-            os.makedirs(folder_path, exist_ok=True)
-            logger.info(f"Created folder: {folder_path}")
-        except Exception as e:
-            logger.error(f"Error creating folder {folder_path}: {e}")
+    def read_keys(file_list, mapper):
+        ordered = sorted(file_list, key=read_order) if read_order else file_list
+        return dict(zip(ordered, mapper(key_func, ordered)))
+
+    def split_bucket(bucket, keys):
+        bucket_groups = {}
+        for file_path in bucket:
+            key = keys[file_path]
+            if key is not None:
+                bucket_groups.setdefault(key, []).append(file_path)
+        return [group for group in bucket_groups.values() if len(group) > 1]
+
+    groups = []
+    if executor:
+        keys = read_keys([file_path for bucket in buckets for file_path in bucket], executor.map)
+        for bucket in buckets:
+            groups.extend(split_bucket(bucket, keys))
+    else:
+        for bucket in buckets:
+            groups.extend(split_bucket(bucket, read_keys(bucket, map)))
+    return groups
+
+def ensure_folder(folder_path):
+    """
+    Create a folder unless it already exists.
 
-def erase_empty_folders(path, folder_names):
+    Args:
+        folder_path (str): Path of the folder to create
     """
-    Remove empty folders from the directory.
+    try:
+        os.mkdir(folder_path)
+        logger.info("Created folder: %s", folder_path)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        logger.error("Error creating folder %s: %s", folder_path, e)
+
+def fast_move(src, dst):
+    """
+    Move a file with a single rename, falling back to shutil.move across filesystems.
+
+    Like shutil.move, an existing destination file is overwritten on every platform.
 
     Args:
-        path (str): Base path where folders are located
-        folder_names (list): List of folder names to check and remove if empty
+        src (str): Path of the file to move
+        dst (str): Destination file path
     """
-    for folder_name in folder_names:
-        folder_path = os.path.join(path, folder_name)
-        try:
-            if (os.path.exists(folder_path) and
-                os.path.isdir(folder_path) and
-                not os.listdir(folder_path)):
-                os.rmdir(folder_path)
-                logger.info(f"Removed empty folder: {folder_path}")
-        except Exception as e:
-            logger.error(f"Error removing folder {folder_path}: {e}")
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+def move_file(file_path, dest_folder, size=None):
+    """
+    Move a file into a folder and log the result.
+
+    Args:
+        file_path (str): Path of the file to move
+        dest_folder (str): Folder to move the file into
+        size (int): File size in bytes to include in the log message (optional)
+    """
+    file_name = os.path.basename(file_path)
+    try:
+        fast_move(file_path, os.path.join(dest_folder, file_name))
+        if size is None:
+            logger.info("Moved file: %s → %s/", file_name, dest_folder)
+        else:
+            logger.info("Moved file: %s → %s/ (size: %.2f MB)", file_name, dest_folder, size / (1024 * 1024))
+    except Exception as e:
+        logger.error("Error moving file %s: %s", file_name, e)
+
+def move_files(moves):
+    """
+    Move files concurrently on a thread pool.
+
+    Only folders that receive at least one file are created, each once and
+    before any move starts.
+
+    Args:
+        moves (list): List of (file path, destination folder[, size]) tuples
+    """
+    for dest_folder in dict.fromkeys(move[1] for move in moves):
+        ensure_folder(dest_folder)
+
+    with ThreadPoolExecutor(max_workers=get_max_workers()) as executor:
+        list(executor.map(lambda move: move_file(*move), moves))
 
 def organize_by_extension(files, path):
     """
     Organize files based on their extensions.
 
     Args:
-        files (list): List of file paths to organize
+        files (list): List of (file path, os.stat_result) pairs to organize
         path (str): Base path where files are located
     """
-    extensions_set = set()
-    for file_path in files:
+    # Bucket files by extension folder in a single pass
+    buckets = {}
+    for file_path, _ in files:
         _, ext = os.path.splitext(file_path)
         if ext:
-            extensions_set.add(ext[1:].lower())
-
-    # Create folders for each extension
-    folder_names = [f"{ext}_files" for ext in extensions_set]
-    create_folders(path, folder_names)
+            buckets.setdefault(f"{ext[1:].lower()}_files", []).append(file_path)
 
     # Move files to their respective folders
-    for file_path in files:
-        try:
-            file_name = os.path.basename(file_path)
-            _, ext = os.path.splitext(file_name)
-            if ext:
-                ext = ext[1:].lower()
-                dest_folder = os.path.join(path, f"{ext}_files")
-                dest_path = os.path.join(dest_folder, file_name)
-                shutil.move(file_path, dest_path)
-                logger.info(f"Moved file: {file_name} → {dest_folder}/")
-        except Exception as e:
-            logger.error(f"Error moving file {file_name}: {e}")
+    moves = []
+    for folder_name, file_paths in buckets.items():
+        dest_folder = os.path.join(path, folder_name)
+        moves.extend((file_path, dest_folder) for file_path in file_paths)
+    move_files(moves)
 
 def organize_by_size(files, path):
     """
     Organize files based on their size.
 
     Args:
-        files (list): List of file paths to organize
+        files (list): List of (file path, os.stat_result) pairs to organize
         path (str): Base path where files are located
     """
-    # Create folders for size categories
-    folder_names = ["light_files", "medium_files", "heavy_files"]
-    create_folders(path, folder_names)
+    light_folder, medium_folder, heavy_folder = (
+        os.path.join(path, name) for name in ("light_files", "medium_files", "heavy_files")
+    )
 
     # Move files to appropriate folders based on size
-    for file_path in files:
-        try:
-            file_name = os.path.basename(file_path)
-            size_mb = get_file_size(file_path)
-
-            if size_mb < 10:  # Light: less than 10MB
-                dest_folder = "light_files"
-            elif size_mb < 100:  # Medium: less than 100MB
-                dest_folder = "medium_files"
-            else:  # Heavy: more than 100MB
-                dest_folder = "heavy_files"
-
-            dest_path = os.path.join(path, dest_folder, file_name)
-            shutil.move(file_path, dest_path)
-            logger.info(f"Moved file: {file_name} → {dest_folder}/ (size: {size_mb} MB)")
-        except Exception as e:
-            logger.error(f"Error moving file {file_name}: {e}")
+    moves = []
+    for file_path, stat_res in files:
+        size = stat_res.st_size
+
+        if size < LIGHT_MB * 1024 * 1024:  # Light: less than LIGHT_MB
+            dest_folder = light_folder
+        elif size < MEDIUM_MB * 1024 * 1024:  # Medium: less than MEDIUM_MB
+            dest_folder = medium_folder
+        else:  # Heavy: MEDIUM_MB or more
+            dest_folder = heavy_folder
+
+        moves.append((file_path, dest_folder, size))
+    move_files(moves)
+
+@lru_cache(maxsize=None)
+def get_date_folder_name(day):
+    """
+    Get the folder name for a calendar day, cached per day.
+
+    Args:
+        day (tuple): Local (year, month, day) of a modification time
 
-    # Remove empty size folders
-    erase_empty_folders(path, folder_names)
+    Returns:
+        str: Date in '%Y-%m-%d' format (Persian calendar when available)
+    """
+    if KHAYYAM_AVAILABLE:
+        # Noon keeps the timestamp inside the same day across DST changes
+        modify_time = time.mktime(day + (12, 0, 0, 0, 0, -1))
+        return str(JalaliDatetime.fromtimestamp(modify_time).strftime('%Y-%m-%d'))
+    return datetime(*day).strftime('%Y-%m-%d')
 
 def organize_by_last_modify_date(files, path):
     """
     Organize files based on their last modification date.
 
     Args:
-        files (list): List of file paths to organize
+        files (list): List of (file path, os.stat_result) pairs to organize
         path (str): Base path where files are located
     """
-    folder_names = set()
-
-    # First, collect all unique folder names
-    for file_path in files:
+    # Work out each file's destination folder in a single pass
+    decisions = []
+    for file_path, stat_res in files:
         try:
-            modify_time = os.path.getmtime(file_path)
-            if KHAYYAM_AVAILABLE:
-                folder_name = str(JalaliDatetime.fromtimestamp(modify_time).strftime('%Y-%m-%d'))
-            else:
-                folder_name = datetime.fromtimestamp(modify_time).strftime('%Y-%m-%d')
-            folder_names.add(folder_name)
+            folder_name = get_date_folder_name(time.localtime(stat_res.st_mtime)[:3])
+            decisions.append((file_path, folder_name))
         except Exception as e:
-            logger.error(f"Error getting modification time for {file_path}: {e}")
-
-    # Create all folders
-    create_folders(path, list(folder_names))
+            logger.error("Error getting modification time for %s: %s", file_path, e)
 
     # Move files to appropriate folders
-    for file_path in files:
-        try:
-            file_name = os.path.basename(file_path)
-            modify_time = os.path.getmtime(file_path)
-
-            if KHAYYAM_AVAILABLE:
-                folder_name = str(JalaliDatetime.fromtimestamp(modify_time).strftime('%Y-%m-%d'))
-            else:
-                folder_name = datetime.fromtimestamp(modify_time).strftime('%Y-%m-%d')
-
-            dest_folder = os.path.join(path, folder_name)
-            dest_path = os.path.join(dest_folder, file_name)
-            shutil.move(file_path, dest_path)
-            logger.info(f"Moved file: {file_name} → {dest_folder}/")
-        except Exception as e:
-            logger.error(f"Error moving file {file_name}: {e}")
+    move_files([(file_path, os.path.join(path, folder_name)) for file_path, folder_name in decisions])
 
 def remove_duplicates(files, path):
     """
     Remove duplicate files while keeping one copy of each.
 
     Args:
-        files (list): List of file paths to check for duplicates
+        files (list): List of (file path, os.stat_result) pairs to check for duplicates
         path (str): Base path where files are located
     """
     # Group files by size first for efficiency
     files_by_size = {}
-    for file_path in files:
-        try:
-            size = os.path.getsize(file_path)
-            if size not in files_by_size:
-                files_by_size[size] = []
-            files_by_size[size].append(file_path)
-        except Exception as e:
-            logger.error(f"Error getting size for {file_path}: {e}")
-
-    # Find and remove duplicates
-    duplicates = []
+    sizes = {}
+    inodes = {}
+    for file_path, stat_res in files:
+        files_by_size.setdefault(stat_res.st_size, []).append(file_path)
+        sizes[file_path] = stat_res.st_size
+        inodes[file_path] = stat_res.st_ino
+
+    # Buckets of small files are compared by content unless holding a whole bucket
+    # in memory would exceed SMALL_BUCKET_BYTES; those are hashed instead
+    small_buckets, large_buckets = [], []
     for size, file_list in files_by_size.items():
         if len(file_list) > 1:
-            # Use hashing for more accurate duplicate detection
-            file_hashes = {}
-            for file_path in file_list:
-                file_hash = calculate_file_hash(file_path)
-                if file_hash:
-                    if file_hash in file_hashes:
-                        duplicates.append(file_path)
-                    else:
-                        file_hashes[file_hash] = file_path
+            if size <= SMALL_FILE_SIZE and size * len(file_list) <= SMALL_BUCKET_BYTES:
+                small_buckets.append(file_list)
+            else:
+                large_buckets.append(file_list)
+
+    # Small files are cheaper to compare byte for byte than to hash. These reads and
+    # the prehash reads are too short to be worth a thread pool's per-task overhead.
+    groups = group_files(small_buckets, read_file_content, read_order=inodes.get)
+
+    # Compare the first block before reading whole files
+    prehash_groups = group_files(
+        large_buckets,
+        lambda p: calculate_file_hash(p, max_bytes=PREHASH_SIZE),
+        read_order=inodes.get
+    )
+    full_hash_buckets = []
+    for candidates in prehash_groups:
+        if sizes[candidates[0]] <= PREHASH_SIZE:
+            # The prehash already covered the whole file
+            groups.append(candidates)
+        else:
+            full_hash_buckets.append(candidates)
+
+    # Full hashes of the remaining candidates share one thread pool. With a single
+    # worker they are read serially, strictly in inode order, which suits HDDs.
+    if full_hash_buckets:
+        workers = get_max_workers()
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                groups.extend(group_files(full_hash_buckets, calculate_file_hash, executor, inodes.get))
+        else:
+            groups.extend(group_files(full_hash_buckets, calculate_file_hash, read_order=inodes.get))
+
+    duplicates = [dup_file for group in groups for dup_file in group[1:]]
 
     # Remove duplicate files
     for dup_file in duplicates:
         try:
             os.remove(dup_file)
-            logger.info(f"Removed duplicate: {os.path.basename(dup_file)}")
+            logger.info("Removed duplicate: %s", os.path.basename(dup_file))
         except Exception as e:
-            logger.error(f"Error removing duplicate {dup_file}: {e}")
+            logger.error("Error removing duplicate %s: %s", dup_file, e)
 
 def main():
     """Main function to handle command line arguments and execute organization tasks."""
@@ -337,6 +497,7 @@ def main():
     )
 
     args = parser.parse_args()
+    setup_logging()
 
     # Check if only one option is selected
     options = [args.extension, args.size, args.erase_duplicates, args.last_modify_date]
@@ -348,11 +509,11 @@ def main():
 
     path = os.path.abspath(args.path)
     if not os.path.exists(path):
-        logger.error(f"The path {path} does not exist.")
+        logger.error("The path %s does not exist.", path)
         return
 
     if not os.path.isdir(path):
-        logger.error(f"The path {path} is not a directory.")
+        logger.error("The path %s is not a directory.", path)
         return
 
     files = get_files(path)
@@ -360,7 +521,7 @@ def main():
         logger.warning("No files found to organize.")
         return
 
-    logger.info(f"Found {len(files)} files to organize in {path}")
+    logger.info("Found %s files to organize in %s", len(files), path)
 
     if args.extension:
         organize_by_extension(files, path)